@@ -1,4 +1,6 @@
 # NIRCam specific rountines go here
+import warnings
+from functools import lru_cache
 import numpy as np
 from astropy.io import fits
 import astraeus.xarrayIO as xrio
@@ -7,10 +9,10 @@ from . import sigrej, background, optspex, straighten, plots_s3
 from ..lib.util import read_time, supersample
 from ..lib import meanerr as me
 
-__all__ = ['read', 'straighten_trace', 'flag_ff', 'flag_bg', 'flag_bg_phot',
-           'fit_bg', 'cut_aperture', 'standard_spectrum', 'clean_median_flux',
-           'do_oneoverf_corr', 'calibrated_spectra',
-           'residualBackground', 'lc_nodriftcorr']
+__all__ = ['read', 'poly_wavelength', 'straighten_trace', 'flag_ff',
+           'flag_bg', 'flag_bg_phot', 'fit_bg', 'cut_aperture',
+           'standard_spectrum', 'clean_median_flux', 'do_oneoverf_corr',
+           'calibrated_spectra', 'residualBackground', 'lc_nodriftcorr']
 
 
 def read(filename, data, meta, log):
@@ -56,23 +58,21 @@ def read(filename, data, meta, log):
     data.attrs['mhdr'] = hdulist[0].header
     data.attrs['shdr'] = hdulist['SCI', 1].header
 
-    data.attrs['intstart'] = data.attrs['mhdr']['INTSTART']-1
-    data.attrs['intend'] = data.attrs['mhdr']['INTEND']
-
     sci = hdulist['SCI', 1].data
     err = hdulist['ERR', 1].data
     dq = hdulist['DQ', 1].data
     v0 = hdulist['VAR_RNOISE', 1].data
 
-    try:
-        data.attrs['intstart'] = data.attrs['mhdr']['INTSTART']-1
-        data.attrs['intend'] = data.attrs['mhdr']['INTEND']
-    except:
-        # FINDME: Need to only catch the particular exception we expect
+    mhdr = data.attrs['mhdr']
+    if 'INTSTART' not in mhdr or 'INTEND' not in mhdr:
+        # Only trust the header if both values are given
         log.writelog('  WARNING: Manually setting INTSTART to 0 and INTEND '
                      'to NINTS')
         data.attrs['intstart'] = 0
         data.attrs['intend'] = sci.shape[0]
+    else:
+        data.attrs['intstart'] = mhdr['INTSTART']-1
+        data.attrs['intend'] = mhdr['INTEND']
 
     meta.filter = data.attrs['mhdr']['FILTER']
 
@@ -82,38 +82,17 @@ def read(filename, data, meta, log):
         if not meta.poly_wavelength:
             # Use the FITS data
             wave_2d = hdulist['WAVELENGTH', 1].data
-        elif meta.filter == 'F322W2':
+        elif meta.filter in ['F322W2', 'F444W']:
             # The new way, using the polynomial model Everett Schlawin computed
-            X = np.arange(hdulist['WAVELENGTH', 1].data.shape[1], dtype=float)
-            if meta.wave_pixel_offset is not None:
-                if meta.firstFile:
-                    log.writelog('\n  Offsetting polynomial wavelength '
-                                 f'solution by {meta.wave_pixel_offset} '
-                                 'pixels.')
-                X += meta.wave_pixel_offset
-            Xprime = (X - 1571)/1000
-            wave_2d = (3.9269369110332657
-                       + 0.9811653393151226*Xprime
-                       + 0.001666535535484272*Xprime**2
-                       - 0.002874123523765872*Xprime**3)
-            # Convert 1D array to 2D
-            wave_2d = np.repeat(wave_2d[np.newaxis],
-                                hdulist['WAVELENGTH', 1].data.shape[0], axis=0)
-        elif meta.filter == 'F444W':
-            # The new way, using the polynomial model Everett Schlawin computed
-            X = np.arange(hdulist['WAVELENGTH', 1].data.shape[1], dtype=float)
-            if meta.wave_pixel_offset is not None:
-                if meta.firstFile:
-                    log.writelog('\n  Offsetting polynomial wavelength '
-                                 f'solution by {meta.wave_pixel_offset} '
-                                 'pixels.')
-                X += meta.wave_pixel_offset
-            Xprime = (X - 852.0756)/1000
-            wave_2d = (3.928041104137344
-                       + 0.979649332832983*Xprime)
-            # Convert 1D array to 2D
-            wave_2d = np.repeat(wave_2d[np.newaxis],
-                                hdulist['WAVELENGTH', 1].data.shape[0], axis=0)
+            if meta.wave_pixel_offset is not None and meta.firstFile:
+                log.writelog('\n  Offsetting polynomial wavelength '
+                             f'solution by {meta.wave_pixel_offset} '
+                             'pixels.')
+            ny, nx = hdulist['WAVELENGTH', 1].shape
+            poly_wave = poly_wavelength(meta.filter, nx,
+                                        meta.wave_pixel_offset)
+            # Convert 1D array to 2D using a read-only view
+            wave_2d = np.broadcast_to(poly_wave, (ny, nx))
         # Increase pixel resolution along cross-dispersion direction
         if meta.expand > 1:
             log.writelog(f'    Super-sampling y axis from {sci.shape[1]} ' +
@@ -123,6 +102,9 @@ def read(filename, data, meta, log):
             err = supersample(err, meta.expand, 'err', axis=1)
             dq = supersample(dq, meta.expand, 'cal', axis=1)
             v0 = supersample(v0, meta.expand, 'flux', axis=1)
+            if not wave_2d.flags.writeable:
+                # supersample interpolates over NaNs in place
+                wave_2d = wave_2d.copy()
             wave_2d = supersample(wave_2d, meta.expand, 'wave', axis=0)
 
     elif hdulist[0].header['CHANNEL'] == 'SHORT':
@@ -136,14 +118,14 @@ def read(filename, data, meta, log):
         # FINDME: make this better for all filters
         if meta.filter == 'F210M':
             # will be deleted at the end of S3
-            wave_1d = np.ones_like(sci[0, 0]) * 2.095
+            wave_1d = np.full(sci.shape[2], 2.095, dtype=sci.dtype)
             # Is used in S4 for plotting.
             meta.phot_wave = 2.095
         elif meta.filter == 'F187N':
-            wave_1d = np.ones_like(sci[0, 0]) * 1.874
+            wave_1d = np.full(sci.shape[2], 1.874, dtype=sci.dtype)
             meta.phot_wave = 1.874
         elif meta.filter in ['WLP4', 'F212N']:
-            wave_1d = np.ones_like(sci[0, 0]) * 2.121
+            wave_1d = np.full(sci.shape[2], 2.121, dtype=sci.dtype)
             meta.phot_wave = 2.121
 
     # Record integration mid-times in BMJD_TDB
@@ -190,11 +172,67 @@ def read(filename, data, meta, log):
     else:
         data['wave_1d'] = (['x'], wave_1d)
         data['wave_1d'].attrs['wave_units'] = wave_units
-    # Initialize bad pixel mask (False = good, True = bad)
+    # Initialize bad pixel mask (False = good, True = bad). np.zeros gets
+    # zeroed pages lazily from the OS, and the mask is written in place by
+    # almost every later step, so it is kept as a plain writeable bool array
     data['mask'] = (['time', 'y', 'x'], np.zeros(data.flux.shape, dtype=bool))
+
+    # Close the file now that all of the data have been read in (any
+    # memory-mapped arrays remain valid after closing the file)
+    hdulist.close()
+
     return data, meta, log
 
 
+@lru_cache(maxsize=None)
+def poly_wavelength(filt, nx, wave_pixel_offset=None):
+    """Compute Everett Schlawin's polynomial wavelength solution.
+
+    The result only depends on the inputs, so it is cached and reused for
+    every file in a segmented observation.
+
+    Parameters
+    ----------
+    filt : str
+        The NIRCam filter name. Must be one of F322W2 or F444W.
+    nx : int
+        The number of pixels along the dispersion direction.
+    wave_pixel_offset : float; optional
+        The number of pixels by which to offset the wavelength solution.
+        Defaults to None (no offset).
+
+    Returns
+    -------
+    wave_1d : ndarray (1D)
+        The (read-only) wavelength array in microns.
+
+    Raises
+    ------
+    ValueError
+        If there is no polynomial wavelength solution for the filter.
+    """
+    X = np.arange(nx, dtype=float)
+    if wave_pixel_offset is not None:
+        X += wave_pixel_offset
+    if filt == 'F322W2':
+        Xprime = (X - 1571)/1000
+        # Evaluate the cubic polynomial using Horner's method
+        wave_1d = (3.9269369110332657
+                   + Xprime*(0.9811653393151226
+                             + Xprime*(0.001666535535484272
+                                       - 0.002874123523765872*Xprime)))
+    elif filt == 'F444W':
+        Xprime = (X - 852.0756)/1000
+        wave_1d = (3.928041104137344
+                   + 0.979649332832983*Xprime)
+    else:
+        raise ValueError(f'There is no polynomial wavelength solution for '
+                         f'the {filt} filter.')
+    # Prevent callers from modifying the cached array
+    wave_1d.flags.writeable = False
+    return wave_1d
+
+
 def flag_bg(data, meta, log):
     '''Outlier rejection of sky background along time axis.
 
@@ -218,22 +256,26 @@ def flag_bg(data, meta, log):
     size = data.mask.size
     prev_count = (~data.mask.values).sum()
 
-    bgdata1 = data.flux[:, :meta.bg_y1]
-    bgmask1 = data.mask[:, :meta.bg_y1]
-    bgdata2 = data.flux[:, meta.bg_y2:]
-    bgmask2 = data.mask[:, meta.bg_y2:]
+    # Work on the underlying arrays to avoid the overhead of xarray indexing
+    flux = data.flux.values
+    err = data.err.values
+    mask = data.mask.values
+    bgdata1 = flux[:, :meta.bg_y1]
+    bgmask1 = mask[:, :meta.bg_y1]
+    bgdata2 = flux[:, meta.bg_y2:]
+    bgmask2 = mask[:, meta.bg_y2:]
     if meta.use_estsig:
-        bgerr1 = np.median(data.err[:, :meta.bg_y1])
-        bgerr2 = np.median(data.err[:, meta.bg_y2:])
-        estsig1 = [bgerr1 for j in range(len(meta.bg_thresh))]
-        estsig2 = [bgerr2 for j in range(len(meta.bg_thresh))]
+        bgerr1 = np.median(err[:, :meta.bg_y1])
+        bgerr2 = np.median(err[:, meta.bg_y2:])
+        estsig1 = [bgerr1]*len(meta.bg_thresh)
+        estsig2 = [bgerr2]*len(meta.bg_thresh)
     else:
         estsig1 = None
         estsig2 = None
-    data['mask'][:, :meta.bg_y1] = sigrej.sigrej(bgdata1, meta.bg_thresh,
-                                                 bgmask1, estsig1)
-    data['mask'][:, meta.bg_y2:] = sigrej.sigrej(bgdata2, meta.bg_thresh,
-                                                 bgmask2, estsig2)
+    mask[:, :meta.bg_y1] = sigrej.sigrej(bgdata1, meta.bg_thresh,
+                                         bgmask1, estsig1)
+    mask[:, meta.bg_y2:] = sigrej.sigrej(bgdata2, meta.bg_thresh,
+                                         bgmask2, estsig2)
 
     # Count difference in number of good pixels
     new_count = (~data.mask.values).sum()
@@ -269,12 +311,13 @@ def flag_bg_phot(data, meta, log):
     prev_count = (~data.mask.values).sum()
 
     # Figure out which pixels are outside of the source aperture
-    x_indices, y_indices = np.meshgrid(np.arange(data.flux.shape[2]),
-                                       np.arange(data.flux.shape[1]))
-    mean_x = np.ma.median(data.centroid_x.values)
-    mean_y = np.ma.median(data.centroid_y.values)
-    distance = np.sqrt((x_indices-mean_x)**2 + (y_indices-mean_y)**2)
-    outside_aper = distance > meta.photap
+    y_indices, x_indices = np.ogrid[:data.flux.shape[1],
+                                    :data.flux.shape[2]]
+    mean_x = np.nanmedian(data.centroid_x.values)
+    mean_y = np.nanmedian(data.centroid_y.values)
+    # Compare squared distances to avoid computing a square root
+    outside_aper = ((x_indices-mean_x)**2 + (y_indices-mean_y)**2 >
+                    meta.photap**2)
 
     # Do sigrej only on the pixels outside of the source aperture
     bgdata = data.flux.values[:, outside_aper]
@@ -409,12 +452,13 @@ def cut_aperture(data, meta, log):
 
     ap_y1 = int(meta.src_ypos-meta.spec_hw)
     ap_y2 = int(meta.src_ypos+meta.spec_hw+1)
-    apdata = data.flux[:, ap_y1:ap_y2].values
-    aperr = data.err[:, ap_y1:ap_y2].values
-    apmask = data.mask[:, ap_y1:ap_y2].values
-    apbg = data.bg[:, ap_y1:ap_y2].values
-    apv0 = data.v0[:, ap_y1:ap_y2].values
-    apmedflux = data.medflux[ap_y1:ap_y2].values
+    # Slice the underlying arrays to avoid xarray's indexing overhead
+    apdata = data.flux.values[:, ap_y1:ap_y2]
+    aperr = data.err.values[:, ap_y1:ap_y2]
+    apmask = data.mask.values[:, ap_y1:ap_y2]
+    apbg = data.bg.values[:, ap_y1:ap_y2]
+    apv0 = data.v0.values[:, ap_y1:ap_y2]
+    apmedflux = data.medflux.values[ap_y1:ap_y2]
 
     return apdata, aperr, apmask, apbg, apv0, apmedflux
 
@@ -496,12 +540,18 @@ def clean_median_flux(data, meta, log, m):
     """
     log.writelog('  Computing clean median frame...', mute=(not meta.verbose))
 
-    # Compute median flux using masked arrays
-    flux_ma = np.ma.masked_where(data.mask.values, data.flux.values)
-    medflux = np.ma.median(flux_ma, axis=0)
-    # Compute median error array
-    err_ma = np.ma.masked_where(data.mask.values, data.err.values)
-    mederr = np.ma.median(err_ma, axis=0)
+    # Compute median flux with masked pixels set to NaN, which is much
+    # faster than using masked arrays. Pixels that are masked in every
+    # integration remain masked in the median frame.
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='All-NaN slice')
+        medflux = np.nanmedian(np.where(data.mask.values, np.nan,
+                                        data.flux.values), axis=0)
+        # Compute median error array
+        mederr = np.nanmedian(np.where(data.mask.values, np.nan,
+                                       data.err.values), axis=0)
+    medflux = np.ma.masked_invalid(medflux)
+    mederr = np.ma.masked_invalid(mederr)
 
     # Call subroutine
     clean_flux = optspex.get_clean(data, meta, log, medflux, mederr)
@@ -546,14 +596,10 @@ def do_oneoverf_corr(data, meta, i, star_pos_x, log):
     # Let's first determine which amplifier regions are left in the frame.
     # For NIRCam: 4 amplifiers, 512 pixels in x dimension per amplifier
     # Every NIRCam subarray has 2048 pixels in the x dimension
-    pxl_idxs = np.arange(2048)
-    pxl_in_window_bool = np.zeros(2048, dtype=bool)
-    # pxl_in_window_bool is True for pixels which weren't trimmed away
-    # by meta.xwindow
-    for p in pxl_idxs:
-        if meta.xwindow[0] <= pxl_idxs[p] < meta.xwindow[1]:
-            pxl_in_window_bool[p] = True
-    ampl_used_bool = np.any(pxl_in_window_bool.reshape((4, 512)), axis=1)
+    # An amplifier is used if its columns overlap with meta.xwindow
+    edges = np.array([[0, 512], [512, 1024], [1024, 1536], [1536, 2048]])
+    ampl_used_bool = ((edges[:, 0] < meta.xwindow[1]) &
+                      (edges[:, 1] > meta.xwindow[0]))
     # Example: if only the middle two amplifier are left after trimming:
     # ampl_used = [False, True, True, False]
 
@@ -563,19 +609,25 @@ def do_oneoverf_corr(data, meta, i, star_pos_x, log):
         np.array([star_pos_x_untrim-meta.oneoverf_dist,
                   star_pos_x_untrim+meta.oneoverf_dist])
 
-    use_cols = np.ones(2048, dtype=bool)
-    for p in pxl_idxs:
-        if star_exclusion_area_untrim[0] <= p < star_exclusion_area_untrim[1]:
-            use_cols[p] = False
+    pxl_idxs = np.arange(2048)
+    use_cols = ((pxl_idxs < star_exclusion_area_untrim[0]) |
+                (pxl_idxs >= star_exclusion_area_untrim[1]))
     use_cols = use_cols[meta.xwindow[0]:meta.xwindow[1]]
     # Array with bools checking if column should be used for
     # background subtraction
 
+    # Views of the current integration (edits to flux_i modify data.flux)
+    flux_i = data.flux.values[i]
+    err_i = data.err.values[i]
+    mask_i = data.mask.values[i]
+
     edges_all = []
     flux_all = []
     err_all = []
     mask_all = []
-    edges = np.array([[0, 512], [512, 1024], [1024, 1536], [1536, 2048]])
+
+    # Column indices within the trimmed frame
+    inds = np.arange(len(use_cols))
 
     # Let's go through each amplifier region
     for k in range(4):
@@ -588,40 +640,51 @@ def do_oneoverf_corr(data, meta, i, star_pos_x, log):
             continue
         edge = edges[k] - meta.xwindow[0]
         edge[np.where(edge < 0)] = 0
-        use_cols_temp = np.copy(use_cols)
-        inds = np.arange(len(use_cols_temp))
         # Set False if columns are out of amplifier region
-        use_cols_temp[np.logical_or(inds < edge[0], inds >= edge[1])] = False
+        use_cols_temp = use_cols & (inds >= edge[0]) & (inds < edge[1])
         edges_all.append(edge)
-        flux_all.append(data.flux.values[i][:, use_cols_temp])
-        err_all.append(data.err.values[i][:, use_cols_temp])
-        mask_all.append(data.mask.values[i][:, use_cols_temp])
+        flux_all.append(flux_i[:, use_cols_temp])
+        err_all.append(err_i[:, use_cols_temp])
+        mask_all.append(mask_i[:, use_cols_temp])
 
     # Do odd even column subtraction
-    odd_cols = data.flux.values[i, :, ::2]
-    even_cols = data.flux.values[i, :, 1::2]
+    odd_cols = flux_i[:, ::2]
+    even_cols = flux_i[:, 1::2]
     use_cols_odd = use_cols[::2]
     use_cols_even = use_cols[1::2]
-    odd_median = np.nanmedian(odd_cols[:, use_cols_odd])
-    even_median = np.nanmedian(even_cols[:, use_cols_even])
-    data.flux.values[i, :, ::2] -= odd_median
-    data.flux.values[i, :, 1::2] -= even_median
+    # Boolean indexing already returns copies, so the medians can safely
+    # partition them in place
+    odd_median = np.nanmedian(odd_cols[:, use_cols_odd], overwrite_input=True)
+    even_median = np.nanmedian(even_cols[:, use_cols_even],
+                               overwrite_input=True)
+    # Subtract both medians in a single pass over the frame
+    col_offsets = np.empty(flux_i.shape[1])
+    col_offsets[::2] = odd_median
+    col_offsets[1::2] = even_median
+    flux_i -= col_offsets
 
     if meta.oneoverf_corr == 'meanerr':
-        for j in range(128):
-            for k in range(4):
-                if ampl_used_bool[k]:
-                    edges_temp = edges_all[k]
-                    data.flux.values[i][j, edges_temp[0]:edges_temp[1]] -= \
-                        me.meanerr(flux_all[k][j], err_all[k][j],
-                                   mask=mask_all[k][j], err=False)
+        for k in range(4):
+            if ampl_used_bool[k]:
+                edges_temp = edges_all[k]
+                # Compute the weighted mean of every row at once. Rows
+                # without any good pixels are left uncorrected.
+                row_means = me.meanerr(flux_all[k], err_all[k],
+                                       mask=mask_all[k], err=False, axis=1)
+                flux_i[:, edges_temp[0]:edges_temp[1]] -= \
+                    np.ma.filled(row_means, 0)[:, None]
     elif meta.oneoverf_corr == 'median':
         for k in range(4):
             if ampl_used_bool[k]:
                 edges_temp = edges_all[k]
-                temp_vals = np.ma.masked_where(mask_all[k], flux_all[k])
-                data.flux.values[i][:, edges_temp[0]:edges_temp[1]] -= \
-                    np.ma.median(temp_vals, axis=1)[:, None]
+                temp_vals = np.where(mask_all[k], np.nan, flux_all[k])
+                # Rows without any good pixels are left uncorrected
+                with warnings.catch_warnings():
+                    warnings.filterwarnings('ignore', message='All-NaN slice')
+                    row_medians = np.nanmedian(temp_vals, axis=1)
+                row_medians[~np.isfinite(row_medians)] = 0
+                flux_i[:, edges_temp[0]:edges_temp[1]] -= \
+                    row_medians[:, None]
     else:
         raise AssertionError(f'The 1/f correction method {meta.oneoverf_corr} '
                              'is not supported. Please choose between meanerr '
@@ -657,9 +720,9 @@ def calibrated_spectra(data, meta, log):
     # Convert from MJy/sr to mJy
     log.writelog("  Converting from MJy/sr to mJy...",
                  mute=(not meta.verbose))
-    data['flux'].data *= 1e9*data.shdr['PIXAR_SR']
-    data['err'].data *= 1e9*data.shdr['PIXAR_SR']
-    data['v0'].data *= 1e9*data.shdr['PIXAR_SR']
+    scale = 1e9*data.shdr['PIXAR_SR']
+    for name in ['flux', 'err', 'v0']:
+        np.multiply(data[name].values, scale, out=data[name].values)
 
     # Update units
     data['flux'].attrs["flux_units"] = 'mJy'
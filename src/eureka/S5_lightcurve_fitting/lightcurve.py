@@ -256,7 +256,8 @@ class LightCurve(m.Model):
                 fname_tag = f'ch{ch_number}'
             fname = (f'figs{os.sep}fig5103_{fname_tag}_all_fits' +
                      plots.figure_filetype)
-            fig.savefig(meta.outputdir+fname, bbox_inches='tight', dpi=300)
+            fig.savefig(meta.outputdir+fname, dpi=meta.fig_dpi,
+                        bbox_inches=meta.fig_bbox_inches)
             if not meta.hide_plots:
                 plt.pause(0.2)
 
@@ -294,7 +295,8 @@ class LightCurve(m.Model):
                     fname_tag = f'ch{ch_number}'
                 fname = (f'figs{os.sep}fig5306_{fname_tag}_all_fits' +
                          plots.figure_filetype)
-                fig.savefig(meta.outputdir+fname, bbox_inches='tight', dpi=300)
+                fig.savefig(meta.outputdir+fname, dpi=meta.fig_dpi,
+                            bbox_inches=meta.fig_bbox_inches)
                 if not meta.hide_plots:
                     plt.pause(0.2)
 
@@ -2,22 +2,13 @@ import os
 import sys
 import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib import rcParams
+from matplotlib.collections import PolyCollection
 try:
     from mc3.stats import time_avg
 except ModuleNotFoundError:
     print("Could not import MC3. No RMS time-averaging plots will be made.")
 import corner
 from scipy import stats
-import fleck
-import astropy.units as unit
-try:
-    import arviz as az
-    from arviz.rcparams import rcParams as az_rcParams
-    import starry
-except ModuleNotFoundError:
-    # PyMC3 hasn't been installed
-    pass
 try:
     from harmonica import HarmonicaTransit
 except ModuleNotFoundError:
@@ -56,15 +47,32 @@ def plot_fit(lc, model, meta, fitter, isTitle=True):
     model_phys_full, new_time, nints_interp = \
         model.physeval(interp=meta.interp)
     model_noGP = model.eval(incl_GP=False)
-    model_gp = model.GPeval(model_noGP)
-    model_eval = model_noGP+model_gp
+    if any(component.modeltype == 'GP' for component in model.components):
+        model_gp = model.GPeval(model_noGP)
+        model_eval = model_noGP+model_gp
+        normflux_full = lc.flux/model_sys_full - model_gp
+    else:
+        # Without a GP the GP model is all zeros, so skip evaluating it
+        model_eval = model_noGP
+        normflux_full = lc.flux/model_sys_full
+
+    # Make the figure once and reuse its axes for every channel. Since the
+    # same figure is redrawn for the next channel (and Matplotlib isn't
+    # thread-safe), each savefig must finish before moving on rather than
+    # being handed off to a background thread
+    fig = plt.figure(5101, figsize=(8, 6))
+    fig.clf()
+    ax = fig.subplots(3, 1)
+    fig.get_layout_engine().set(hspace=0, h_pad=0)
 
+    ch_width = len(str(lc.nchannel))
     for i, channel in enumerate(lc.fitted_channels):
-        flux = np.ma.copy(lc.flux)
-        unc = np.ma.copy(lc.unc_fit)
-        model_lc = np.ma.copy(model_eval)
-        gp = np.ma.copy(model_gp)
-        model_sys = model_sys_full
+        # None of these arrays are modified below and split returns views,
+        # so there is no need to copy them
+        flux = lc.flux
+        unc = lc.unc_fit
+        model_lc = model_eval
+        normflux = normflux_full
         model_phys = model_phys_full
         color = lc.colors[i]
 
@@ -73,8 +81,8 @@ def plot_fit(lc, model, meta, fitter, isTitle=True):
             new_timet = new_time
 
             # Split the arrays that have lengths of the original time axis
-            flux, unc, model_lc, model_sys, gp = \
-                split([flux, unc, model_lc, model_sys, gp],
+            flux, unc, model_lc, normflux = \
+                split([flux, unc, model_lc, normflux],
                       meta.nints, channel)
 
             # Split the arrays that have lengths of the new (potentially
@@ -82,8 +90,8 @@ def plot_fit(lc, model, meta, fitter, isTitle=True):
             model_phys = split([model_phys, ], nints_interp, channel)[0]
         elif meta.multwhite:
             # Split the arrays that have lengths of the original time axis
-            time, flux, unc, model_lc, model_sys, gp = \
-                split([lc.time, flux, unc, model_lc, model_sys, gp],
+            time, flux, unc, model_lc, normflux = \
+                split([lc.time, flux, unc, model_lc, normflux],
                       meta.nints, channel)
 
             # Split the arrays that have lengths of the new (potentially
@@ -101,21 +109,23 @@ def plot_fit(lc, model, meta, fitter, isTitle=True):
             binned_time = time
             binned_flux = flux
             binned_unc = unc
-            binned_normflux = flux/model_sys - gp
+            binned_normflux = normflux
             binned_res = residuals
         else:
             nbin_plot = meta.nbin_plot
-            binned_time = util.binData_time(time, time, nbin=nbin_plot)
-            binned_flux = util.binData_time(flux, time, nbin=nbin_plot)
-            binned_unc = util.binData_time(unc, time, nbin=nbin_plot, err=True)
-            binned_normflux = util.binData_time(flux/model_sys - gp, time,
-                                                nbin=nbin_plot)
-            binned_res = util.binData_time(residuals, time, nbin=nbin_plot)
-
-        fig = plt.figure(5101, figsize=(8, 6))
-        plt.clf()
-
-        ax = fig.subplots(3, 1)
+            # Compute the time bins once and reuse them for every array
+            bin_inds = util.get_time_bins(time, nbin=nbin_plot)
+            binned_time = util.binData_time(time, time, nbin=nbin_plot,
+                                            bin_inds=bin_inds)
+            binned_unc = util.binData_time(unc, time, nbin=nbin_plot, err=True,
+                                           bin_inds=bin_inds)
+            # Bin all of the flux-like arrays together in a single pass
+            binned_flux, binned_normflux, binned_res = util.binData_time(
+                np.ma.stack([flux, normflux, residuals]), time,
+                nbin=nbin_plot, bin_inds=bin_inds)
+
+        for a in ax:
+            a.clear()
         ax[0].errorbar(binned_time, binned_flux, yerr=binned_unc, fmt='.',
                        color='w', ecolor=color, mec=color)
         ax[0].plot(time, model_lc, '.', ls='', ms=1, color='0.3', zorder=10)
@@ -137,17 +147,17 @@ def plot_fit(lc, model, meta, fitter, isTitle=True):
         ax[2].set_ylabel('Residuals (ppm)', size=14)
         ax[2].set_xlabel(str(lc.time_units), size=14)
 
-        fig.get_layout_engine().set(hspace=0, h_pad=0)
         fig.align_ylabels(ax)
 
         if lc.white:
             fname_tag = 'white'
         else:
-            ch_number = str(channel).zfill(len(str(lc.nchannel)))
+            ch_number = str(channel).zfill(ch_width)
             fname_tag = f'ch{ch_number}'
         fname = (f'figs{os.sep}fig5101_{fname_tag}_lc_{fitter}'
                  + plots.figure_filetype)
-        fig.savefig(meta.outputdir+fname, bbox_inches='tight', dpi=300)
+        fig.savefig(meta.outputdir+fname, dpi=meta.fig_dpi,
+                    bbox_inches=meta.fig_bbox_inches)
         if not meta.hide_plots:
             plt.pause(0.2)
 
@@ -173,28 +183,38 @@ def plot_phase_variations(lc, model, meta, fitter, isTitle=True):
                          f'{type(fitter)}')
 
     model_sys = model.syseval()
-    model_noGP = model.eval(incl_GP=False)
-    model_gp = model.GPeval(model_noGP)
     model_phys_full, new_time, nints_interp = \
         model.physeval(interp=meta.interp)
 
-    flux_full = np.ma.copy(lc.flux)
-    unc_full = np.ma.copy(lc.unc_fit)
-    flux_full = flux_full/model_sys-model_gp
+    # The division already makes a new array, so lc.flux is left untouched
+    flux_full = lc.flux/model_sys
+    if any(component.modeltype == 'GP' for component in model.components):
+        # Only evaluate and remove the GP if one was fit
+        model_noGP = model.eval(incl_GP=False)
+        flux_full -= model.GPeval(model_noGP)
 
     # Normalize to zero flux at eclipse
     flux_full -= 1
     model_phys_full -= 1
 
-    # Convert to ppm
-    model_phys_full *= 1e6
-    flux_full *= 1e6
-    unc_full *= 1e6
-
+    # Make the figures once and reuse their axes for every channel
+    fig = plt.figure(5104, figsize=(8, 6))
+    fig.clf()
+    ax = fig.gca()
+    fig.patch.set_facecolor('white')
+    if meta.isplots_S5 >= 3:
+        fig2 = plt.figure(5304, figsize=(8, 6))
+        fig2.clf()
+        ax2 = fig2.gca()
+        fig2.patch.set_facecolor('white')
+
+    ch_width = len(str(lc.nchannel))
     for i, channel in enumerate(lc.fitted_channels):
-        flux = np.ma.copy(flux_full)
-        unc = np.ma.copy(unc_full)
-        model_phys = np.ma.copy(model_phys_full)
+        # None of these arrays are modified below and split returns views,
+        # so there is no need to copy them
+        flux = flux_full
+        unc = lc.unc_fit
+        model_phys = model_phys_full
         color = lc.colors[i]
 
         if lc.share and not meta.multwhite:
@@ -228,20 +248,27 @@ def plot_phase_variations(lc, model, meta, fitter, isTitle=True):
             binned_unc = unc
         else:
             nbin_plot = meta.nbin_plot
-            binned_time = util.binData_time(time, time, nbin=nbin_plot)
-            binned_flux = util.binData_time(flux, time, nbin=nbin_plot)
-            binned_unc = util.binData_time(unc, time, nbin=nbin_plot, err=True)
+            # Compute the time bins once and reuse them for every array
+            bin_inds = util.get_time_bins(time, nbin=nbin_plot)
+            binned_time = util.binData_time(time, time, nbin=nbin_plot,
+                                            bin_inds=bin_inds)
+            binned_flux = util.binData_time(flux, time, nbin=nbin_plot,
+                                            bin_inds=bin_inds)
+            binned_unc = util.binData_time(unc, time, nbin=nbin_plot, err=True,
+                                           bin_inds=bin_inds)
+
+        # Convert to ppm only for the values of this channel, after binning
+        binned_flux = binned_flux*1e6
+        binned_unc = binned_unc*1e6
+        model_phys = model_phys*1e6
 
         # Setup the figure
-        fig = plt.figure(5104, figsize=(8, 6))
-        plt.clf()
-        ax = fig.gca()
+        ax.clear()
         if isTitle:
             ax.set_title(f'{meta.eventlabel} - Channel {channel} - '
                          f'{fitter}')
         ax.set_ylabel('Normalized Flux - 1 (ppm)', size=14)
         ax.set_xlabel(str(lc.time_units), size=14)
-        fig.patch.set_facecolor('white')
 
         # Plot the binned observations
         ax.errorbar(binned_time, binned_flux, yerr=binned_unc, fmt='.',
@@ -260,47 +287,46 @@ def plot_phase_variations(lc, model, meta, fitter, isTitle=True):
         if lc.white:
             fname_tag = 'white'
         else:
-            ch_number = str(channel).zfill(len(str(lc.nchannel)))
+            ch_number = str(channel).zfill(ch_width)
             fname_tag = f'ch{ch_number}'
         fname = (f'figs{os.sep}fig5104_{fname_tag}_phaseVariations_{fitter}'
                  + plots.figure_filetype)
-        fig.savefig(meta.outputdir+fname, bbox_inches='tight', dpi=300)
+        fig.savefig(meta.outputdir+fname, dpi=meta.fig_dpi,
+                    bbox_inches=meta.fig_bbox_inches)
         if not meta.hide_plots:
             plt.pause(0.2)
 
         if meta.isplots_S5 >= 3:
             # Setup the figure
-            fig = plt.figure(5304, figsize=(8, 6))
-            plt.clf()
-            ax = fig.gca()
+            ax2.clear()
             if isTitle:
-                ax.set_title(f'{meta.eventlabel} - Channel {channel} - '
-                             f'{fitter}')
-            ax.set_ylabel('Normalized Flux - 1 (ppm)', size=14)
-            ax.set_xlabel(str(lc.time_units), size=14)
-            fig.patch.set_facecolor('white')
+                ax2.set_title(f'{meta.eventlabel} - Channel {channel} - '
+                              f'{fitter}')
+            ax2.set_ylabel('Normalized Flux - 1 (ppm)', size=14)
+            ax2.set_xlabel(str(lc.time_units), size=14)
 
             # Plot the unbinned data without errorbars
-            ax.plot(time, flux, '.', c='k', zorder=0, alpha=0.01)
+            ax2.plot(time, flux*1e6, '.', c='k', zorder=0, alpha=0.01)
             # Plot the binned data with errorbars
-            ax.errorbar(binned_time, binned_flux, yerr=binned_unc, fmt='.',
-                        color=color, zorder=1)
+            ax2.errorbar(binned_time, binned_flux, yerr=binned_unc, fmt='.',
+                         color=color, zorder=1)
             # Plot the physical model
-            ax.plot(new_timet, model_phys, '.', ls='', ms=2, color='0.3',
-                    zorder=10)
+            ax2.plot(new_timet, model_phys, '.', ls='', ms=2, color='0.3',
+                     zorder=10)
 
             # Set nice axis limits
-            ax.set_ylim(-3*sigma, max_astro+3*sigma)
-            ax.set_xlim(np.ma.min(time), np.ma.max(time))
+            ax2.set_ylim(-3*sigma, max_astro+3*sigma)
+            ax2.set_xlim(np.ma.min(time), np.ma.max(time))
             # Save/show the figure
             if lc.white:
                 fname_tag = 'white'
             else:
-                ch_number = str(channel).zfill(len(str(lc.nchannel)))
+                ch_number = str(channel).zfill(ch_width)
                 fname_tag = f'ch{ch_number}'
             fname = (f'figs{os.sep}fig5304_{fname_tag}_phaseVariations'
                      f'_{fitter}' + plots.figure_filetype)
-            fig.savefig(meta.outputdir+fname, bbox_inches='tight', dpi=300)
+            fig2.savefig(meta.outputdir+fname, dpi=meta.fig_dpi,
+                         bbox_inches=meta.fig_bbox_inches)
             if not meta.hide_plots:
                 plt.pause(0.2)
 
@@ -325,12 +351,13 @@ def plot_rms(lc, model, meta, fitter):
 
     model_eval = model.eval(incl_GP=True)
 
+    ch_width = len(str(lc.nchannel))
     for channel in lc.fitted_channels:
         if 'mc3.stats' not in sys.modules:
             # If MC3 failed to load, exit for loop
             break
-        flux = np.ma.copy(lc.flux)
-        model_lc = np.ma.copy(model_eval)
+        flux = lc.flux
+        model_lc = model_eval
 
         if lc.share and not meta.multwhite:
             time = lc.time
@@ -344,11 +371,11 @@ def plot_rms(lc, model, meta, fitter):
         else:
             time = lc.time
 
-        residuals = np.ma.masked_invalid(flux-model_lc)
-        residuals = residuals[np.ma.argsort(time)]
-
-        # Remove masked values
-        residuals = residuals[~np.ma.getmaskarray(residuals)]
+        # Sort by time and remove masked/non-finite values using plain
+        # ndarrays to avoid the masked-array overhead
+        order = np.argsort(np.ma.getdata(time))
+        residuals = np.ma.filled(flux-model_lc, np.nan)[order]
+        residuals = residuals[np.isfinite(residuals)]
         # Compute RMS range
         maxbins = residuals.size//10
         if maxbins < 2:
@@ -358,7 +385,7 @@ def plot_rms(lc, model, meta, fitter):
                                                     binstep=1)
         normfactor = 1e-6
         fig = plt.figure(
-            int('52{}'.format(str(0).zfill(len(str(lc.nchannel))))),
+            int('52{}'.format(str(0).zfill(ch_width))),
             figsize=(8, 6))
         fig.clf()
         ax = fig.gca()
@@ -382,7 +409,7 @@ def plot_rms(lc, model, meta, fitter):
         ax.legend(loc=1)
 
         # Add second x-axis using time instead of N-binned
-        dt = np.ma.min(np.ma.diff(time))*24*3600
+        dt = np.min(np.diff(np.ma.compressed(time)))*24*3600
 
         def t_N(N):
             return N*dt
@@ -397,16 +424,17 @@ def plot_rms(lc, model, meta, fitter):
         if lc.white:
             fname_tag = 'white'
         else:
-            ch_number = str(channel).zfill(len(str(lc.nchannel)))
+            ch_number = str(channel).zfill(ch_width)
             fname_tag = f'ch{ch_number}'
         fname = (f'figs{os.sep}fig5301_{fname_tag}_RMS_TimeAveraging_{fitter}'
                  + plots.figure_filetype)
-        plt.savefig(meta.outputdir+fname, bbox_inches='tight', dpi=300)
+        plt.savefig(meta.outputdir+fname, dpi=meta.fig_dpi,
+                    bbox_inches=meta.fig_bbox_inches)
         if not meta.hide_plots:
             plt.pause(0.2)
 
 
-def plot_corner(samples, lc, meta, freenames, fitter):
+def plot_corner(samples, lc, meta, freenames, fitter, max_samples=20000):
     """Plot a corner plot. (Figs 5501)
 
     Parameters
@@ -421,43 +449,49 @@ def plot_corner(samples, lc, meta, freenames, fitter):
         The metadata object.
     fitter : str
         The name of the fitter (for plot filename).
+    max_samples : int or None; optional
+        The maximum number of samples to plot. If there are more samples
+        than this, they are evenly thinned down to at most max_samples
+        before making the histograms. Set to None to plot all samples.
+        Defaults to 20000.
     """
     ndim = len(freenames)+1  # One extra for the 1D histogram
 
-    # Don't allow offsets or scientific notation in tick labels
-    old_useOffset = rcParams['axes.formatter.useoffset']
-    old_xtick_labelsize = rcParams['xtick.labelsize']
-    old_ytick_labelsize = rcParams['ytick.labelsize']
-    old_constrained_layout = rcParams['figure.constrained_layout.use']
-    rcParams['axes.formatter.useoffset'] = False
-    rcParams['xtick.labelsize'] = 10
-    rcParams['ytick.labelsize'] = 10
-    rcParams['figure.constrained_layout.use'] = False
-
-    fig = plt.figure(5501, figsize=(ndim*1.4, ndim*1.4))
-    fig.clf()
-    fig = corner.corner(samples, fig=fig, quantiles=[0.16, 0.5, 0.84],
-                        max_n_ticks=3, labels=freenames, show_titles=True,
-                        title_fmt='.3', title_kwargs={"fontsize": 10},
-                        label_kwargs={"fontsize": 10}, fontsize=10,
-                        labelpad=0.25)
-
-    if lc.white:
-        fname_tag = 'white'
-    else:
-        ch_number = str(lc.channel).zfill(len(str(lc.nchannel)))
-        fname_tag = f'ch{ch_number}'
-    fname = (f'figs{os.sep}fig5501_{fname_tag}_corner_{fitter}'
-             + plots.figure_filetype)
-    fig.savefig(meta.outputdir+fname, bbox_inches='tight', pad_inches=0.05,
-                dpi=300)
-    if not meta.hide_plots:
-        plt.pause(0.2)
+    # Compute the plotting range from all the samples in one pass so that
+    # the axes limits are unaffected by thinning
+    plot_range = np.stack([np.min(samples, axis=0),
+                           np.max(samples, axis=0)], axis=1)
+    if max_samples is not None and len(samples) > max_samples:
+        samples = samples[::int(np.ceil(len(samples)/max_samples))]
+    # Hand corner one contiguous float64 array so it doesn't need to make
+    # its own casted copies (this is a no-op if samples already is one)
+    samples = np.ascontiguousarray(samples, dtype=np.float64)
+
+    # Don't allow offsets or scientific notation in tick labels. The
+    # context manager restores the old settings even if plotting fails
+    with plt.rc_context({'axes.formatter.useoffset': False,
+                         'xtick.labelsize': 10,
+                         'ytick.labelsize': 10,
+                         'figure.constrained_layout.use': False}):
+        fig = plt.figure(5501, figsize=(ndim*1.4, ndim*1.4))
+        fig.clf()
+        fig = corner.corner(samples, fig=fig, quantiles=[0.16, 0.5, 0.84],
+                            max_n_ticks=3, labels=freenames, show_titles=True,
+                            title_fmt='.3', title_kwargs={"fontsize": 10},
+                            label_kwargs={"fontsize": 10}, fontsize=10,
+                            labelpad=0.25, range=plot_range)
 
-    rcParams['axes.formatter.useoffset'] = old_useOffset
-    rcParams['xtick.labelsize'] = old_xtick_labelsize
-    rcParams['ytick.labelsize'] = old_ytick_labelsize
-    rcParams['figure.constrained_layout.use'] = old_constrained_layout
+        if lc.white:
+            fname_tag = 'white'
+        else:
+            ch_number = str(lc.channel).zfill(len(str(lc.nchannel)))
+            fname_tag = f'ch{ch_number}'
+        fname = (f'figs{os.sep}fig5501_{fname_tag}_corner_{fitter}'
+                 + plots.figure_filetype)
+        fig.savefig(meta.outputdir+fname, dpi=meta.fig_dpi,
+                    bbox_inches=meta.fig_bbox_inches, pad_inches=0.05)
+        if not meta.hide_plots:
+            plt.pause(0.2)
 
 
 def plot_chain(samples, lc, meta, freenames, fitter='emcee', burnin=False,
@@ -491,6 +525,13 @@ def plot_chain(samples, lc, meta, freenames, fitter='emcee', burnin=False,
     nsubplots = nrows*ncols
     nplots = int(np.ceil(len(freenames)/nsubplots))
 
+    # Compute the percentiles of all parameters at once. np.percentile
+    # already uses a single np.partition for all requested percentiles, so
+    # this does not require a full sort along the walker axis
+    xvals = np.arange(samples.shape[0])[::nthin]
+    percentiles = np.percentile(samples[::nthin],
+                                [0.15, 2.5, 16, 50, 84, 97.5, 99.85], axis=1)
+
     k = 0
     for plot_number in range(nplots):
         fig = plt.figure(5303, figsize=(6*ncols, 4*nrows))
@@ -502,11 +543,8 @@ def plot_chain(samples, lc, meta, freenames, fitter='emcee', burnin=False,
                 if k >= samples.shape[2]:
                     axes[i][j].set_axis_off()
                     continue
-                vals = samples[::nthin, :, k]
-                xvals = np.arange(samples.shape[0])[::nthin]
                 n3sig, n2sig, n1sig, med, p1sig, p2sig, p3sig = \
-                    np.percentile(vals, [0.15, 2.5, 16, 50, 84, 97.5, 99.85],
-                                  axis=1)
+                    percentiles[:, :, k]
                 axes[i][j].fill_between(xvals, n3sig, p3sig, alpha=0.2,
                                         label=r'3$\sigma$')
                 axes[i][j].fill_between(xvals, n2sig, p2sig, alpha=0.2,
@@ -544,8 +582,8 @@ def plot_chain(samples, lc, meta, freenames, fitter='emcee', burnin=False,
         if nplots > 1:
             fname += f'_plot{plot_number+1}of{nplots}'
         fname += plots.figure_filetype
-        fig.savefig(meta.outputdir+fname, bbox_inches='tight',
-                    pad_inches=0.05, dpi=300)
+        fig.savefig(meta.outputdir+fname, bbox_inches=meta.fig_bbox_inches,
+                    pad_inches=0.05, dpi=meta.fig_dpi)
         if not meta.hide_plots:
             plt.pause(0.2)
 
@@ -575,6 +613,11 @@ def plot_trace(trace, model, lc, freenames, meta, fitter='nuts', compact=False,
         Additional keyword arguments to pass to pm.traceplot.
     """
 
+    # Imported here rather than at module level since arviz is only needed
+    # for the NUTS fitter and is slow to import
+    import arviz as az
+    from arviz.rcparams import rcParams as az_rcParams
+
     max_subplots = az_rcParams['plot.max_subplots'] // 2
     nplots = int(np.ceil(len(freenames)/max_subplots))
     npanels = min([len(freenames), max_subplots])
@@ -595,8 +638,8 @@ def plot_trace(trace, model, lc, freenames, meta, fitter='nuts', compact=False,
         fname += '_'+fitter
         fname += f'figure{i+1}of{nplots}'
         fname += plots.figure_filetype
-        fig.savefig(meta.outputdir+fname, bbox_inches='tight',
-                    pad_inches=0.05, dpi=300)
+        fig.savefig(meta.outputdir+fname, bbox_inches=meta.fig_bbox_inches,
+                    pad_inches=0.05, dpi=meta.fig_dpi)
         if not meta.hide_plots:
             plt.pause(0.2)
         else:
@@ -623,13 +666,22 @@ def plot_res_distr(lc, model, meta, fitter):
 
     model_eval = model.eval(incl_GP=True)
 
+    # Make the figure once and reuse its axes for every channel
+    fig = plt.figure(5302, figsize=(8, 6))
+    fig.clf()
+    ax = fig.gca()
+
+    # The unit normal distribution doesn't change between channels
+    x = np.linspace(-4., 4., 200)
+    px = stats.norm.pdf(x, loc=0, scale=1)
+
+    ch_width = len(str(lc.nchannel))
     for channel in lc.fitted_channels:
-        plt.figure(5302, figsize=(8, 6))
-        plt.clf()
+        ax.clear()
 
-        flux = np.ma.copy(lc.flux)
-        unc = np.ma.copy(lc.unc_fit)
-        model_lc = np.ma.copy(model_eval)
+        flux = lc.flux
+        unc = lc.unc_fit
+        model_lc = model_eval
 
         if lc.share or meta.multwhite:
             # Split the arrays that have lengths of the original time axis
@@ -639,22 +691,24 @@ def plot_res_distr(lc, model, meta, fitter):
         residuals = flux - model_lc
         hist_vals = residuals/unc
         # Mask out any infinities or nans
-        hist_vals = np.ma.masked_invalid(hist_vals)
-
-        n, bins, patches = plt.hist(hist_vals, alpha=0.5, color='b',
-                                    edgecolor='b', lw=1)
-        x = np.linspace(-4., 4., 200)
-        px = stats.norm.pdf(x, loc=0, scale=1)
-        plt.plot(x, px*(bins[1]-bins[0])*len(residuals), 'k-', lw=2)
-        plt.xlabel("Residuals/Uncertainty", fontsize=14)
+        hist_vals = np.ma.masked_invalid(hist_vals).compressed()
+
+        # Bin with NumPy and draw the bars directly rather than having
+        # ax.hist handle the masked array (using the same default bins)
+        n, bins = np.histogram(hist_vals, bins=plt.rcParams['hist.bins'])
+        ax.bar(bins[:-1], n, width=np.diff(bins), align='edge', alpha=0.5,
+               color='b', edgecolor='b', lw=1)
+        ax.plot(x, px*(bins[1]-bins[0])*len(residuals), 'k-', lw=2)
+        ax.set_xlabel("Residuals/Uncertainty", fontsize=14)
         if lc.white:
             fname_tag = 'white'
         else:
-            ch_number = str(channel).zfill(len(str(lc.nchannel)))
+            ch_number = str(channel).zfill(ch_width)
             fname_tag = f'ch{ch_number}'
         fname = (f'figs{os.sep}fig5302_{fname_tag}_res_distri_{fitter}'
                  + plots.figure_filetype)
-        plt.savefig(meta.outputdir+fname, bbox_inches='tight', dpi=300)
+        fig.savefig(meta.outputdir+fname, dpi=meta.fig_dpi,
+                    bbox_inches=meta.fig_bbox_inches)
         if not meta.hide_plots:
             plt.pause(0.2)
 
@@ -683,11 +737,20 @@ def plot_GP_components(lc, model, meta, fitter, isTitle=True):
     model_GP = model.GPeval(model_eval)
     model_with_GP = model_eval + model_GP
 
+    # Make the figure once and reuse its axes for every channel
+    fig = plt.figure(5102, figsize=(8, 6))
+    fig.clf()
+    ax = fig.subplots(3, 1)
+    fig.get_layout_engine().set(hspace=0, h_pad=0)
+
+    ch_width = len(str(lc.nchannel))
     for i, channel in enumerate(lc.fitted_channels):
-        flux = np.ma.copy(lc.flux)
-        unc = np.ma.copy(lc.unc_fit)
-        model_lc = np.ma.copy(model_with_GP)
-        model_GP_component = np.ma.copy(model_GP)
+        # None of these arrays are modified below and split returns views,
+        # so there is no need to copy them
+        flux = lc.flux
+        unc = lc.unc_fit
+        model_lc = model_with_GP
+        model_GP_component = model_GP
         color = lc.colors[i]
 
         if lc.share and not meta.multwhite:
@@ -705,9 +768,8 @@ def plot_GP_components(lc, model, meta, fitter, isTitle=True):
             time = lc.time
 
         residuals = flux - model_lc
-        fig = plt.figure(5102, figsize=(8, 6))
-        plt.clf()
-        ax = fig.subplots(3, 1)
+        for a in ax:
+            a.clear()
         ax[0].errorbar(time, flux, yerr=unc, fmt='.', color='w',
                        ecolor=color, mec=color)
         ax[0].plot(time, model_lc, '.', ls='', ms=2, color='0.3',
@@ -728,22 +790,22 @@ def plot_GP_components(lc, model, meta, fitter, isTitle=True):
         ax[2].set_ylabel('Residuals (ppm)', size=14)
         ax[2].set_xlabel(str(lc.time_units), size=14)
 
-        fig.get_layout_engine().set(hspace=0, h_pad=0)
         fig.align_ylabels(ax)
 
         if lc.white:
             fname_tag = 'white'
         else:
-            ch_number = str(channel).zfill(len(str(lc.nchannel)))
+            ch_number = str(channel).zfill(ch_width)
             fname_tag = f'ch{ch_number}'
         fname = (f'figs{os.sep}fig5102_{fname_tag}_lc_GP_{fitter}'
                  + plots.figure_filetype)
-        fig.savefig(meta.outputdir+fname, bbox_inches='tight', dpi=300)
+        fig.savefig(meta.outputdir+fname, dpi=meta.fig_dpi,
+                    bbox_inches=meta.fig_bbox_inches)
         if not meta.hide_plots:
             plt.pause(0.2)
 
 
-def plot_eclipse_map(lc, flux_maps, meta, fitter):
+def plot_eclipse_map(lc, flux_maps, meta, fitter, max_samples=20000):
     """Plot fitted eclipse map and lat-lon slices (Figs 5105)
 
     Parameters
@@ -756,24 +818,63 @@ def plot_eclipse_map(lc, flux_maps, meta, fitter):
         The metadata object.
     fitter : str
         The name of the fitter (for plot filename).
+    max_samples : int or None; optional
+        The maximum number of posterior samples used to compute the plotted
+        quantiles. If flux_maps has more samples than this, they are evenly
+        thinned down to at most max_samples. Set to None to use all samples.
+        Defaults to 20000.
     """
+    if max_samples is not None and len(flux_maps) > max_samples:
+        flux_maps = flux_maps[::int(np.ceil(len(flux_maps)/max_samples))]
+
+    lons = np.linspace(-180, 180, np.shape(flux_maps)[2])
+    lats = np.linspace(-90, 90, np.shape(flux_maps)[1])
+    lat0 = int(np.shape(flux_maps)[2]/2)
+    lon0 = int(np.shape(flux_maps)[1]/2)
+
+    # Quantiles
+    p1 = 0.841
+    p2 = 0.977
+    p3 = 0.998
+    qs = [p1, 1-p1, p2, 1-p2, p3, 1-p3]
+
+    # The maps don't change between channels, so compute the median map
+    # and all of the upper and lower quantiles of the slices only once
+    median_map = 1e6*np.quantile(flux_maps, 0.5, axis=0)
+    # np.quantile would copy the strided slices anyway, so make contiguous
+    # copies once and let np.quantile partition them in place (np.array
+    # always copies, so flux_maps itself is never modified). Single
+    # precision is plenty for ppm-level plotting and halves the memory
+    # traffic of the partitioning
+    eq_slice = np.array(flux_maps[:, lat0], dtype=np.float32, order='C')
+    merid_slice = np.array(flux_maps[:, :, lon0], dtype=np.float32,
+                           order='C')
+    q_lon = 1e6*np.quantile(eq_slice, qs, axis=0, overwrite_input=True)
+    q_lat = 1e6*np.quantile(merid_slice, qs, axis=0, overwrite_input=True)
+
+    # Build the polygons for all three shaded bands of each slice so they
+    # can be drawn as a single collection rather than three fill_betweens.
+    # The bands are rasterized since they gain nothing from being vector
+    # graphics and otherwise bloat PDF/SVG figures
+    lon_verts = [np.column_stack([np.r_[lons, lons[::-1]],
+                                  np.r_[q_lon[j], q_lon[j+1][::-1]]])
+                 for j in range(0, len(qs), 2)]
+    lat_verts = [np.column_stack([np.r_[lats, lats[::-1]],
+                                  np.r_[q_lat[j], q_lat[j+1][::-1]]])
+                 for j in range(0, len(qs), 2)]
+
+    # Make the figure and configure its layout once; clearing the figure
+    # for each channel keeps the layout engine settings
+    fig = plt.figure(5105, figsize=(12, 3))
+    fig.get_layout_engine().set(wspace=0.05, w_pad=0)
+
+    ch_width = len(str(lc.nchannel))
     for i, channel in enumerate(lc.fitted_channels):
-        fig = plt.figure(5105, figsize=(12, 3))
         fig.clf()
         axs = fig.subplots(1, 3, width_ratios=[1.4, 1, 1])
 
-        lons = np.linspace(-180, 180, np.shape(flux_maps)[2])
-        lats = np.linspace(-90, 90, np.shape(flux_maps)[1])
-
-        # Quantiles
-        p1 = 0.841
-        p2 = 0.977
-        p3 = 0.998
-
         # Plot median map
-        ca = axs[0].contourf(lons, lats,
-                             np.quantile(1e6*flux_maps[:], 0.5, axis=0),
-                             cmap='RdBu_r')
+        ca = axs[0].contourf(lons, lats, median_map, cmap='RdBu_r')
         axs[0].axhline(0, color='C0', ls='--')
         axs[0].axvline(0, color='C3', ls='--')
         axs[0].set_xticks([-180, -90, 0, 90, 180])
@@ -784,39 +885,18 @@ def plot_eclipse_map(lc, flux_maps, meta, fitter):
                      label=r'$F_{\rm p}/F_{\rm s}$ (ppm)')
 
         # Plot slice along equator
-        lat0 = int(np.shape(flux_maps)[2]/2)
-        axs[1].fill_between(lons,
-                            1e6*np.quantile(flux_maps[:, lat0], p1, axis=0),
-                            1e6*np.quantile(flux_maps[:, lat0], 1-p1, axis=0),
-                            color='C0', alpha=0.3, ls='None')
-        axs[1].fill_between(lons,
-                            1e6*np.quantile(flux_maps[:, lat0], p2, axis=0),
-                            1e6*np.quantile(flux_maps[:, lat0], 1-p2, axis=0),
-                            color='C0', alpha=0.3, ls='None')
-        axs[1].fill_between(lons,
-                            1e6*np.quantile(flux_maps[:, lat0], p3, axis=0),
-                            1e6*np.quantile(flux_maps[:, lat0], 1-p3, axis=0),
-                            color='C0', alpha=0.3, ls='None')
+        axs[1].add_collection(PolyCollection(lon_verts, facecolor='C0',
+                                             edgecolor='none', alpha=0.3,
+                                             rasterized=True))
+        axs[1].autoscale_view()
         axs[1].set_xlim([-180, 180])
         axs[1].set_xticks([-180, -90, 0, 90, 180])
 
-        # Plot slice along equator
-        lon0 = int(np.shape(flux_maps)[1]/2)
-        axs[2].fill_between(
-            lats,
-            1e6*np.quantile(flux_maps[:, :, lon0], p1, axis=0),
-            1e6*np.quantile(flux_maps[:, :, lon0], 1-p1, axis=0),
-            color='C3', alpha=0.3, ls='None')
-        axs[2].fill_between(
-            lats,
-            1e6*np.quantile(flux_maps[:, :, lon0], p2, axis=0),
-            1e6*np.quantile(flux_maps[:, :, lon0], 1-p2, axis=0),
-            color='C3', alpha=0.3, ls='None')
-        axs[2].fill_between(
-            lats,
-            1e6*np.quantile(flux_maps[:, :, lon0], p3, axis=0),
-            1e6*np.quantile(flux_maps[:, :, lon0], 1-p3, axis=0),
-            color='C3', alpha=0.3, ls='None')
+        # Plot slice along 0 degrees longitude
+        axs[2].add_collection(PolyCollection(lat_verts, facecolor='C3',
+                                             edgecolor='none', alpha=0.3,
+                                             rasterized=True))
+        axs[2].autoscale_view()
         axs[2].set_xlim([-90, 90])
         axs[2].set_xticks([-90, -45, 0, 45, 90])
 
@@ -830,19 +910,21 @@ def plot_eclipse_map(lc, flux_maps, meta, fitter):
         axs[1].set_ylabel(r'$F_{\rm p}/F_{\rm s}$ (ppm)')
         axs[2].set_ylabel(r'$F_{\rm p}/F_{\rm s}$ (ppm)')
 
-        fig.get_layout_engine().set(wspace=0.05, w_pad=0)
-
         if lc.white:
             fname_tag = 'white'
         else:
-            ch_number = str(channel).zfill(len(str(lc.nchannel)))
+            ch_number = str(channel).zfill(ch_width)
             fname_tag = f'ch{ch_number}'
         fname = (f'figs{os.sep}fig5105_{fname_tag}_eclipseMap_{fitter}' +
                  plots.figure_filetype)
 
-        fig.savefig(meta.outputdir+fname, bbox_inches='tight', dpi=300)
-        if not meta.hide_plots:
-            plt.pause(0.2)
+        fig.savefig(meta.outputdir+fname, dpi=meta.fig_dpi,
+                    bbox_inches=meta.fig_bbox_inches)
+
+    if not meta.hide_plots:
+        # Only pause once to show the figure rather than sleeping for
+        # every channel
+        plt.pause(0.2)
 
 
 def plot_fleck_star(lc, model, meta, fitter):
@@ -859,6 +941,14 @@ def plot_fleck_star(lc, model, meta, fitter):
     fitter : str
         The name of the fitter (for plot filename).
     """
+    # Imported here to keep the import of this module lightweight
+    import fleck
+    import astropy.units as unit
+
+    # Make the figure once and just clear it for each channel
+    fig = plt.figure(5307, figsize=(8, 6))
+
+    ch_width = len(str(lc.nchannel))
     for c in range(lc.nchannel_fitted):
         channel = lc.fitted_channels[c]
         if lc.nchannel_fitted > 1:
@@ -869,30 +959,20 @@ def plot_fleck_star(lc, model, meta, fitter):
         # Initialize PlanetParams object
         pl_params = PlanetParams(model, 0, chan)
 
-        # create arrays to hold values
-        spotrad = np.zeros(0)
-        spotlat = np.zeros(0)
-        spotlon = np.zeros(0)
-
-        for n in range(pl_params.nspots):
-            # read radii, latitudes, longitudes, and contrasts
-            if n > 0:
-                spot_id = f'{n}'
-            else:
-                spot_id = ''
-            spotrad = np.concatenate([
-                spotrad, [getattr(pl_params, f'spotrad{spot_id}'),]])
-            spotlat = np.concatenate([
-                spotlat, [getattr(pl_params, f'spotlat{spot_id}'),]])
-            spotlon = np.concatenate([
-                spotlon, [getattr(pl_params, f'spotlon{spot_id}'),]])
+        # read radii, latitudes, longitudes, and contrasts
+        spot_ids = [f'{n}' if n > 0 else '' for n in range(pl_params.nspots)]
+        spotrad = np.array([getattr(pl_params, f'spotrad{spot_id}')
+                            for spot_id in spot_ids], dtype=float)
+        spotlat = np.array([getattr(pl_params, f'spotlat{spot_id}')
+                            for spot_id in spot_ids], dtype=float)
+        spotlon = np.array([getattr(pl_params, f'spotlon{spot_id}')
+                            for spot_id in spot_ids], dtype=float)
 
         if pl_params.spotnpts is None:
             # Have a default spotnpts for fleck
             pl_params.spotnpts = 300
 
-        fig = plt.figure(5307, figsize=(8, 6))
-        plt.clf()
+        fig.clf()
         ax = fig.gca()
         star = fleck.Star(spot_contrast=pl_params.spotcon,
                           u_ld=pl_params.u,
@@ -906,13 +986,17 @@ def plot_fleck_star(lc, model, meta, fitter):
         if lc.white:
             fname_tag = 'white'
         else:
-            ch_number = str(channel).zfill(len(str(lc.nchannel)))
+            ch_number = str(channel).zfill(ch_width)
             fname_tag = f'ch{ch_number}'
         fname = (f'figs{os.sep}fig5307_{fname_tag}_fleck_star_{fitter}'
                  + plots.figure_filetype)
-        fig.savefig(meta.outputdir+fname, bbox_inches='tight', dpi=300)
-        if not meta.hide_plots:
-            plt.pause(0.2)
+        fig.savefig(meta.outputdir+fname, dpi=meta.fig_dpi,
+                    bbox_inches=meta.fig_bbox_inches)
+
+    if not meta.hide_plots:
+        # Only pause once to show the figure rather than sleeping for
+        # every channel
+        plt.pause(0.2)
 
 
 def plot_starry_star(lc, model, meta, fitter):
@@ -929,6 +1013,16 @@ def plot_starry_star(lc, model, meta, fitter):
     fitter : str
         The name of the fitter (for plot filename).
     """
+    # Imported here since starry (and its theano backend) is only needed
+    # for the NUTS fitter and is slow to import
+    import starry
+
+    # Make the figure once and just clear it for each channel
+    fig = plt.figure(5308, figsize=(8, 6))
+    # Building a starry map is slow, so only build one per map degree
+    maps = {}
+
+    ch_width = len(str(lc.nchannel))
     for c in range(lc.nchannel_fitted):
         channel = lc.fitted_channels[c]
         if lc.nchannel_fitted > 1:
@@ -939,26 +1033,16 @@ def plot_starry_star(lc, model, meta, fitter):
         # Initialize PlanetParams object
         pl_params = PlanetParams(model, 0, chan, eval=True)
 
-        # create arrays to hold values
-        spotrad = np.zeros(0)
-        spotlat = np.zeros(0)
-        spotlon = np.zeros(0)
-        spotcon = np.zeros(0)
-
-        for n in range(pl_params.nspots):
-            # read radii, latitudes, longitudes, and contrasts
-            if n > 0:
-                spot_id = f'{n}'
-            else:
-                spot_id = ''
-            spotrad = np.concatenate([
-                spotrad, [getattr(pl_params, f'spotrad{spot_id}'),]])
-            spotlat = np.concatenate([
-                spotlat, [getattr(pl_params, f'spotlat{spot_id}'),]])
-            spotlon = np.concatenate([
-                spotlon, [getattr(pl_params, f'spotlon{spot_id}'),]])
-            spotcon = np.concatenate([
-                spotcon, [getattr(pl_params, f'spotcon{spot_id}'),]])
+        # read radii, latitudes, longitudes, and contrasts
+        spot_ids = [f'{n}' if n > 0 else '' for n in range(pl_params.nspots)]
+        spotrad = np.array([getattr(pl_params, f'spotrad{spot_id}')
+                            for spot_id in spot_ids], dtype=float)
+        spotlat = np.array([getattr(pl_params, f'spotlat{spot_id}')
+                            for spot_id in spot_ids], dtype=float)
+        spotlon = np.array([getattr(pl_params, f'spotlon{spot_id}')
+                            for spot_id in spot_ids], dtype=float)
+        spotcon = np.array([getattr(pl_params, f'spotcon{spot_id}')
+                            for spot_id in spot_ids], dtype=float)
 
         # Apply some conversions since inputs are in fleck units
         spotrad *= 90
@@ -968,27 +1052,36 @@ def plot_starry_star(lc, model, meta, fitter):
             # Have a default spotnpts for starry
             pl_params.spotnpts = 30
 
-        # Initialize map object and add spots
-        map = starry.Map(ydeg=pl_params.spotnpts,
-                         inc=pl_params.spotstari)
+        # Initialize map object (resetting the map from a previous channel
+        # with the same degree, if there is one) and add spots
+        map = maps.get(pl_params.spotnpts)
+        if map is not None:
+            map.reset(inc=pl_params.spotstari)
+        else:
+            map = starry.Map(ydeg=pl_params.spotnpts,
+                             inc=pl_params.spotstari)
+            maps[pl_params.spotnpts] = map
         for n in range(pl_params.nspots):
             map.spot(contrast=spotcon[n], radius=spotrad[n],
                      lat=spotlat[n], lon=spotlon[n])
 
-        fig = plt.figure(5308, figsize=(8, 6))
-        plt.clf()
+        fig.clf()
         ax = fig.gca()
         map.show(ax=ax)
         if lc.white:
             fname_tag = 'white'
         else:
-            ch_number = str(channel).zfill(len(str(lc.nchannel)))
+            ch_number = str(channel).zfill(ch_width)
             fname_tag = f'ch{ch_number}'
         fname = (f'figs{os.sep}fig5308_{fname_tag}_starry_star_{fitter}'
                  + plots.figure_filetype)
-        fig.savefig(meta.outputdir+fname, bbox_inches='tight', dpi=300)
-        if not meta.hide_plots:
-            plt.pause(0.2)
+        fig.savefig(meta.outputdir+fname, dpi=meta.fig_dpi,
+                    bbox_inches=meta.fig_bbox_inches)
+
+    if not meta.hide_plots:
+        # Only pause once to show the figure rather than sleeping for
+        # every channel
+        plt.pause(0.2)
 
 
 def plot_harmonica_string(lc, model, meta, fitter, isTitle=True):
@@ -1007,6 +1100,7 @@ def plot_harmonica_string(lc, model, meta, fitter, isTitle=True):
     isTitle : bool; optional
         Should figure have a title. Defaults to True.
     """
+    ch_width = len(str(lc.nchannel))
     for c in range(lc.nchannel_fitted):
         channel = lc.fitted_channels[c]
         if lc.nchannel_fitted > 1:
@@ -1043,11 +1137,12 @@ def plot_harmonica_string(lc, model, meta, fitter, isTitle=True):
         if lc.white:
             fname_tag = 'white'
         else:
-            ch_number = str(channel).zfill(len(str(lc.nchannel)))
+            ch_number = str(channel).zfill(ch_width)
             fname_tag = f'ch{ch_number}'
         fname = (f'figs{os.sep}fig5309_{fname_tag}_harmonica_string_{fitter}'
                  + plots.figure_filetype)
-        fig.savefig(meta.outputdir+fname, bbox_inches='tight', dpi=300)
+        fig.savefig(meta.outputdir+fname, dpi=meta.fig_dpi,
+                    bbox_inches=meta.fig_bbox_inches)
         if not meta.hide_plots:
             plt.pause(0.2)
 
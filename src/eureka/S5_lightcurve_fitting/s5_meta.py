@@ -192,6 +192,8 @@ class S5MetaClass(MetaClass):
         self.testing_S5 = getattr(self, 'testing_S5', False)
         self.testing_model = getattr(self, 'testing_model', False)
         self.hide_plots = getattr(self, 'hide_plots', True)
+        self.fig_dpi = getattr(self, 'fig_dpi', 300)
+        self.fig_bbox_inches = getattr(self, 'fig_bbox_inches', 'tight')
         self.verbose = getattr(self, 'verbose', True)
 
         # Project directory
@@ -1,7 +1,7 @@
 import numpy as np
 
 
-def meanerr(data, derr, mask=None, err=False, status=False):
+def meanerr(data, derr, mask=None, err=False, status=False, axis=None):
     """
     Calculate the error-weighted mean and the error in the
     error-weighted mean of the input data, omitting masked data, NaN
@@ -20,6 +20,10 @@ def meanerr(data, derr, mask=None, err=False, status=False):
         Set to True to return error in the mean.
     status: boolean
         Set to True to return a bit flag.
+    axis: int; optional
+        The axis along which to compute the error-weighted mean. Defaults
+        to None, in which case the mean is computed over the flattened
+        array.
 
     Returns
     -------
@@ -100,10 +104,10 @@ def meanerr(data, derr, mask=None, err=False, status=False):
     weights = 1/derr**2
 
     # The returns (a tuple if err or status set to True).
-    ret = (np.ma.average(data, weights=weights),)
+    ret = (np.ma.average(data, weights=weights, axis=axis),)
 
     if err:
-        ret = ret + (np.sqrt(1/np.ma.sum(weights)),)
+        ret = ret + (np.sqrt(1/np.ma.sum(weights, axis=axis)),)
 
     if retstatus:
         if np.any(nans):  # NaNs
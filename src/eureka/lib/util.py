@@ -4,7 +4,6 @@ import glob
 from astropy.io import fits
 from scipy.interpolate import griddata
 from scipy.ndimage import zoom
-from scipy.stats import binned_statistic
 import multiprocessing as mp
 from tqdm import tqdm
 
@@ -509,16 +508,54 @@ def binData(data, mask=None, nbin=100, err=False):
     return binned
 
 
-def binData_time(data, time, mask=None, nbin=100, err=False):
+def get_time_bins(time, nbin=100):
+    """Find which of nbin equal-width temporal bins each time falls into.
+
+    The bins span the range of the valid times, matching the bins used by
+    scipy.stats.binned_statistic. The result can be passed to binData_time
+    to bin several arrays that share the same time axis without recomputing
+    the bins each time.
+
+    Parameters
+    ----------
+    time : ndarray (1D)
+        The time axis along which to bin. Masked or non-finite values are
+        not assigned to any bin.
+    nbin : int, optional
+        The number of bins there should be. By default 100.
+
+    Returns
+    -------
+    bin_inds : ndarray (1D)
+        The index of the bin that each time falls into, or -1 for invalid
+        times.
+    """
+    # Find the valid times without building an intermediate masked array
+    good = np.isfinite(np.ma.filled(time, np.nan))
+    time = np.ma.getdata(time)
+
+    bin_inds = np.full(time.shape, -1, dtype=int)
+    if np.any(good):
+        good_time = time[good]
+        edges = np.linspace(good_time.min(), good_time.max(), nbin+1)
+        # The last bin also includes its right edge
+        bin_inds[good] = np.clip(np.digitize(good_time, edges)-1, 0, nbin-1)
+
+    return bin_inds
+
+
+def binData_time(data, time, mask=None, nbin=100, err=False, bin_inds=None):
     """Temporally bin data for easier visualization.
 
     Parameters
     ----------
-    data : ndarray (1D)
-        The data to temporally bin.
+    data : ndarray (1D or 2D)
+        The data to temporally bin. If 2D, each row is binned separately
+        along the last (time) axis, which is faster than binning each row
+        with its own call.
     time : ndarray (1D)
         The time axis along which to bin
-    mask : ndarray (1D); optional
+    mask : ndarray (1D or 2D); optional
         A boolean array of bad values (marked with True) that should be masked.
         Defaults to None, in which case only non-finite values will be masked.
     nbin : int, optional
@@ -526,37 +563,42 @@ def binData_time(data, time, mask=None, nbin=100, err=False):
     err : bool, optional
         If True, divide the binned data by sqrt(N) to get the error on the
         mean. By default False.
+    bin_inds : ndarray (1D); optional
+        The precomputed output of get_time_bins(time, nbin). Defaults to None,
+        in which case the bins will span the times of the unmasked data (for
+        2D data, the times where any row is unmasked).
 
     Returns
     -------
     binned : ndarray
-        The binned data.
+        The binned data, with shape data.shape[:-1]+(nbin,).
     """
     if mask is None:
         mask = ~np.isfinite(data)
 
     # Make a copy for good measure
     data = np.ma.masked_where(mask, data, copy=True)
-
-    # Binned_statistic will copy data without keeping it a masked array
-    # so we have to manually remove invalid points
-    if (type(data.mask) is np.bool_):
-        # Only good data
-        # np.ma.maskarray doesn't work with np.bool_ objects
-        good_time = time
-        good_data = data
-    else:
-        good_time = time[~np.ma.getmaskarray(data)]
-        good_data = data[~np.ma.getmaskarray(data)]
-
-    binned, _, _ = binned_statistic(good_time, good_data,
-                                    statistic='mean',
-                                    bins=nbin)
-    if err:
-        binned_count, _, _ = binned_statistic(good_time, good_data,
-                                              statistic='count',
-                                              bins=nbin)
-        binned /= np.sqrt(binned_count)
+    good = ~np.ma.getmaskarray(data)
+
+    if bin_inds is None:
+        good_time = good if good.ndim == 1 else np.any(good, axis=0)
+        bin_inds = get_time_bins(np.ma.masked_where(~good_time, time), nbin)
+    good &= bin_inds >= 0
+
+    # Give each row its own set of bins so that all of the rows can be
+    # summed up with a single pass
+    shape = data.shape[:-1]
+    nrows = int(np.prod(shape))
+    good_inds = (np.arange(nrows).reshape(shape+(1,))*nbin + bin_inds)[good]
+    binned_count = np.bincount(good_inds, minlength=nrows*nbin)
+    binned_sum = np.bincount(good_inds, weights=np.ma.getdata(data)[good],
+                             minlength=nrows*nbin)
+    binned_count = binned_count.reshape(shape+(nbin,))
+    binned_sum = binned_sum.reshape(shape+(nbin,))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        binned = binned_sum/binned_count
+        if err:
+            binned /= np.sqrt(binned_count)
 
     # Need to mask invalid data in case there is an empty bin
     # (leading to divide by zero)
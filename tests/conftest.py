@@ -11,7 +11,8 @@ def pytest_collection_modifyitems(session, config, items):
     items : List[pytest.Item]
         List of item objects.
     """
-    function_order = ["test_trim", "test_medstddev",
+    function_order = ["test_trim", "test_medstddev", "test_binData_time",
+                      "test_meanerr", "test_nircam_read_intrange",
                       "test_parameter", "test_parameters", "test_model",
                       "test_compositemodel", "test_polynomialmodel",
                       "test_transitmodel", "test_eclipsemodel",
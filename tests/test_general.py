@@ -6,7 +6,11 @@ sys.path.insert(0, '..'+os.sep+'src'+os.sep)
 from eureka.lib import util
 from eureka.lib.readECF import MetaClass
 from eureka.lib.medstddev import medstddev
+from eureka.lib.meanerr import meanerr
+from eureka.lib import logedit
+from eureka.S3_data_reduction import nircam
 import astraeus.xarrayIO as xrio
+from astropy.io import fits
 
 
 def test_trim(capsys):
@@ -77,3 +81,96 @@ def test_medstddev(capsys):
     std, med = medstddev(a, mask, medi=True)
     assert np.isnan(std)
     assert np.isnan(med)
+
+
+def test_binData_time(capsys):
+    # eureka.lib.util.binData_time test
+    time = np.arange(10.)
+    data = np.arange(10.)
+    binned = util.binData_time(data, time, nbin=5)
+    np.testing.assert_allclose(binned, [0.5, 2.5, 4.5, 6.5, 8.5])
+
+    # the error on the mean is divided by sqrt(N)
+    binned = util.binData_time(np.ones(10), time, nbin=5, err=True)
+    np.testing.assert_allclose(binned, np.ones(5)/np.sqrt(2))
+
+    # invalid values are ignored and empty bins are masked
+    data[:2] = np.nan
+    bin_inds = util.get_time_bins(time, nbin=5)
+    binned = util.binData_time(data, time, nbin=5, bin_inds=bin_inds)
+    assert np.ma.getmaskarray(binned)[0]
+    np.testing.assert_allclose(binned[1:], [2.5, 4.5, 6.5, 8.5])
+
+    # 2D data should match binning each row separately
+    data2d = np.array([data, np.arange(10.)**2])
+    binned = util.binData_time(data2d, time, nbin=5, bin_inds=bin_inds)
+    assert binned.shape == (2, 5)
+    for j in range(len(data2d)):
+        np.testing.assert_allclose(
+            binned[j].filled(np.nan),
+            util.binData_time(data2d[j], time, nbin=5,
+                              bin_inds=bin_inds).filled(np.nan))
+
+
+def test_meanerr(capsys):
+    # eureka.lib.meanerr.meanerr test
+    data = np.arange(5) + 5.0
+    derr = np.sqrt(data)
+    mean, err = meanerr(data, derr, err=True)
+    np.testing.assert_allclose((mean, err),
+                               (6.7056945183608301, 1.1580755172579058))
+
+    # computing along an axis should match row-by-row calls
+    data = np.array([data, data[::-1]+1, data*2])
+    derr = np.sqrt(data)
+    mask = np.zeros(data.shape, dtype=bool)
+    mask[0, 2] = True
+    data[1, 3] = np.nan
+    means = meanerr(data, derr, mask=mask, axis=1)
+    for j in range(len(data)):
+        np.testing.assert_allclose(means[j],
+                                   meanerr(data[j], derr[j], mask=mask[j]))
+
+    # rows without any good values should be masked
+    mask[2] = True
+    means = meanerr(data, derr, mask=mask, axis=1)
+    assert np.ma.getmaskarray(means)[2]
+
+
+def test_nircam_read_intrange(capsys, tmp_path):
+    # eureka.S3_data_reduction.nircam.read test of the INTSTART/INTEND
+    # fallback for a later segment whose header is missing only INTEND
+    nt, ny, nx = 5, 4, 6
+    mhdr = fits.Header()
+    mhdr['CHANNEL'] = 'SHORT'
+    mhdr['FILTER'] = 'F210M'
+    mhdr['INTSTART'] = 501
+    sci_hdr = fits.Header()
+    sci_hdr['BUNIT'] = 'MJy/sr'
+    int_times = fits.BinTableHDU.from_columns(
+        [fits.Column(name='int_mid_BJD_TDB', format='D',
+                     array=np.arange(nt, dtype=float))], name='INT_TIMES')
+    hdulist = fits.HDUList([
+        fits.PrimaryHDU(header=mhdr),
+        fits.ImageHDU(np.ones((nt, ny, nx)), header=sci_hdr, name='SCI'),
+        fits.ImageHDU(np.ones((nt, ny, nx)), name='ERR'),
+        fits.ImageHDU(np.zeros((nt, ny, nx), dtype=np.uint32), name='DQ'),
+        fits.ImageHDU(np.ones((nt, ny, nx)), name='VAR_RNOISE'),
+        int_times])
+    filename = str(tmp_path / 'test_calints.fits')
+    hdulist.writeto(filename)
+
+    meta = MetaClass()
+    meta.time_file = None
+    meta.firstFile = True
+    meta.expand = 1
+    meta.spec_hw = meta.bg_hw = 1
+    meta.spec_hw_range = meta.bg_hw_range = [1]
+    meta.ywindow = [0, ny]
+    log = logedit.Logedit(str(tmp_path / 'test.log'))
+
+    data, meta, log = nircam.read(filename, xrio.makeDataset(), meta, log)
+    # Both values should fall back rather than mixing header and defaults
+    assert data.attrs['intstart'] == 0
+    assert data.attrs['intend'] == nt
+    assert data.flux.shape[0] == nt